@@ -1,25 +1,44 @@
 #!/usr/bin/env python3
 
+import os
 import sys
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 
+def _scandir_rec(root_str, rel=""):
+    """
+    Recursive os.scandir walk yielding (relative_path, name) pairs for files.
+
+    Uses DirEntry type info (cached from readdir) instead of per-file stat
+    calls, and plain string concatenation instead of Path objects.
+    Unreadable directories are skipped, matching rglob's behaviour.
+    """
+    try:
+        with os.scandir(root_str) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _scandir_rec(entry.path, rel + entry.name + "/")
+                elif entry.is_file():
+                    yield rel, entry.name
+    except PermissionError:
+        return
+
+
 def collect_files(root: Path):
     """
     Returns a mapping:
-    key   = relative path WITHOUT extension
+    key   = relative path WITHOUT extension (as string)
     value = set of original extensions found
     """
     files = defaultdict(set)
 
-    for f in root.rglob("*"):
-        if not f.is_file():
-            continue
-
-        rel = f.relative_to(root)
-        key = rel.with_suffix("")  # remove extension
-        files[key].add(f.suffix.lower())
+    for rel, name in _scandir_rec(str(root)):
+        # Inline split; dot > 0 keeps dotfiles whole, like Path.with_suffix
+        dot = name.rfind(".")
+        stem, ext = (name[:dot], name[dot:].lower()) if dot > 0 else (name, "")
+        files[rel + stem].add(ext)
 
     return files
 
@@ -32,8 +51,11 @@ def main(dir1: str, dir2: str):
         print("Both arguments must be directories")
         sys.exit(1)
 
-    files1 = collect_files(d1)
-    files2 = collect_files(d2)
+    # Both walks are readdir-bound; overlap them on two threads
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        f1 = ex.submit(collect_files, d1)
+        f2 = ex.submit(collect_files, d2)
+        files1, files2 = f1.result(), f2.result()
 
     keys1 = set(files1.keys())
     keys2 = set(files2.keys())
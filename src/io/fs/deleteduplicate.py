@@ -15,25 +15,30 @@ def clean_duplicates_recursive(target_dir, keep_extension=".jxl", dry_run=True):
     total_deleted = 0
 
     for root, dirs, files in os.walk(target_path):
-        current_dir = Path(root)
         files_map = {}
 
         for filename in files:
-            file_path = current_dir / filename
-            base_name = file_path.stem
-            ext = file_path.suffix.lower()
-
+            # os.walk already hands us plain names; split them without
+            # building a Path per file
+            dot = filename.rfind(".")
+            if dot > 0:
+                base_name, ext = filename[:dot], filename[dot:].lower()
+            else:
+                base_name, ext = filename, ""
+
+            # One pass: track whether the kept extension was seen and
+            # collect the rest, so the decision below is O(1) per stem
             if base_name not in files_map:
-                files_map[base_name] = []
-            files_map[base_name].append(ext)
-
-        for base_name, extensions in files_map.items():
-            if keep_extension in extensions and len(extensions) > 1:
-                for ext in extensions:
-                    if ext == keep_extension:
-                        continue
-
-                    file_to_remove = current_dir / (base_name + ext)
+                files_map[base_name] = [False, []]
+            if ext == keep_extension:
+                files_map[base_name][0] = True
+            else:
+                files_map[base_name][1].append(ext)
+
+        for base_name, (has_keep, others) in files_map.items():
+            if has_keep and others:
+                for ext in others:
+                    file_to_remove = os.path.join(root, base_name + ext)
 
                     if dry_run:
                         print(f"[DRY RUN] Would delete: {file_to_remove}")
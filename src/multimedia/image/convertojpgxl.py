@@ -16,10 +16,14 @@
 # limitations under the RPL.
 
 import argparse
+import atexit
 import io
+import os
 import shutil
 import subprocess
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 
 # --- CONFIGURATION ---
@@ -27,7 +31,11 @@ from pathlib import Path
 # Number of threads for cjxl encoder
 CJXL_THREADS = 12
 
-IMAGE_EXTS = {
+# Shared cjxl argv (threads + effort); built once in main() after
+# argument parsing instead of re-injected into every command
+CJXL_GLOBAL_ARGS = []
+
+IMAGE_EXTS = frozenset({
     ".jpg",
     ".jpeg",
     ".png",
@@ -40,9 +48,9 @@ IMAGE_EXTS = {
     ".jfif",
     ".pjpeg",
     ".pjp",
-}
+})
 
-UNSUPPORTED_EXTS = {".svg", ".gif", ".ico", ".psd", ".pdf"}
+UNSUPPORTED_EXTS = frozenset({".svg", ".gif", ".ico", ".psd", ".pdf"})
 
 # ---------------------
 
@@ -59,38 +67,90 @@ except ImportError:
         "HEIC conversion will likely fail. Please run: pip install pillow pillow-heif"
     )
 
+# Optional: keep libjxl in-process instead of forking cjxl per image.
+# cjxl has no daemon mode, so process startup is paid per file otherwise.
+try:
+    import pillow_jxl  # noqa: F401  (import registers the JXL plugin)
+
+    HAS_PILLOW_JXL = HAS_PILLOW
+except ImportError:
+    HAS_PILLOW_JXL = False
+
+
+def _cjxl_supports_heic() -> bool:
+    """Some cjxl builds decode HEIC directly (libheif); probe once."""
+    try:
+        result = subprocess.run(
+            ["cjxl", "--help", "--verbose"], capture_output=True, text=True
+        )
+        return "heic" in (result.stdout + result.stderr).lower()
+    except OSError:
+        return False
+
+
+# Detected once at startup; lets HEIC skip the Pillow decode roundtrip
+HEIC_NATIVE = _cjxl_supports_heic()
+
+# Resolved once; which() walks and stats every $PATH entry
+EXIFTOOL = shutil.which("exiftool")
+
+
+def iter_files(root: Path):
+    """
+    Streaming recursive scandir walk yielding (Path, ext) for files.
+
+    Unlike rglob + sort this never materializes the tree, and the
+    dirent type info avoids a stat call per entry.
+    """
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        dot = entry.name.rfind(".")
+                        ext = entry.name[dot:].lower() if dot > 0 else ""
+                        yield Path(entry.path), ext
+        except PermissionError:
+            # Skip unreadable directories, matching rglob's behaviour
+            continue
+
 
 def copy_original(input_file, src_root, dst_root, reason="Original kept"):
     rel = input_file.relative_to(src_root)
     out = dst_root / rel
     out.parent.mkdir(parents=True, exist_ok=True)
     if not out.exists():
-        out.write_bytes(input_file.read_bytes())
+        # sendfile under the hood: no whole-file bytes object in Python
+        shutil.copyfile(input_file, out)
     print(f"[COPY] {input_file.name} ({reason})")
 
 
-def run_cjxl_in_memory(cmd_list, args, stdin_data=None):
+def run_cjxl_in_memory(base_args, stdin_data=None):
     """
-    Runs cjxl.
+    Runs cjxl with the shared thread/effort argv prefix.
+    base_args: cjxl arguments without the leading program name.
     stdin_data: Optional bytes to feed into cjxl (e.g. PPM data).
     """
-    # Inject threading argument
-    if "--num_threads" not in cmd_list:
-        cmd_list.insert(1, "--num_threads")
-        cmd_list.insert(2, str(CJXL_THREADS))
-
-    # Inject Effort argument
-    cmd_list.append("--effort")
-    cmd_list.append(str(args.effort))
-
-    result = subprocess.run(cmd_list, input=stdin_data, capture_output=True)
+    # Popen + communicate accepts any bytes-like object, so callers can
+    # hand over a memoryview without an extra bytes copy
+    proc = subprocess.Popen(
+        ["cjxl", *CJXL_GLOBAL_ARGS, *base_args],
+        stdin=subprocess.PIPE if stdin_data is not None else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        bufsize=-1,
+    )
+    stdout, stderr = proc.communicate(stdin_data)
 
     try:
-        stderr_text = result.stderr.decode("utf-8", errors="replace")
+        stderr_text = stderr.decode("utf-8", errors="replace")
     except:
-        stderr_text = str(result.stderr)
+        stderr_text = str(stderr)
 
-    return result.returncode, result.stdout, stderr_text
+    return proc.returncode, stdout, stderr_text
 
 
 def convert_via_pillow(input_file, args, quality=90):
@@ -102,13 +162,31 @@ def convert_via_pillow(input_file, args, quality=90):
 
     try:
         img = Image.open(input_file)
+
+        # In-process encode: no fork/exec, libjxl stays loaded
+        if HAS_PILLOW_JXL:
+            jxl_buffer = io.BytesIO()
+            img.save(
+                jxl_buffer,
+                format="JXL",
+                quality=quality,
+                effort=args.effort,
+                lossless=False,
+            )
+            return jxl_buffer.getvalue()
+
+        # cjxl has no raw-pixel stdin flag, but a hand-built binary P6
+        # header over tobytes() skips Pillow's PPM encoder pass; the
+        # getbuffer() memoryview goes to the pipe without another copy
+        img = img.convert("RGB")
+        width, height = img.size
         ppm_buffer = io.BytesIO()
-        img.save(ppm_buffer, format="PPM")
-        ppm_data = ppm_buffer.getvalue()
+        ppm_buffer.write(b"P6\n%d %d\n255\n" % (width, height))
+        ppm_buffer.write(img.tobytes())
+        ppm_data = ppm_buffer.getbuffer()
 
-        cjxl_cmd = ["cjxl", "-", "-", "--quality", str(quality), "--lossless_jpeg=0"]
-        # Pass args to helper so effort is included
-        code, jxl_data, err = run_cjxl_in_memory(cjxl_cmd, args, stdin_data=ppm_data)
+        cjxl_cmd = ["-", "-", "--quality", str(quality), "--lossless_jpeg=0"]
+        code, jxl_data, err = run_cjxl_in_memory(cjxl_cmd, stdin_data=ppm_data)
 
         if code != 0:
             raise RuntimeError(f"CJXL failed on Pillow output: {err}")
@@ -119,21 +197,82 @@ def convert_via_pillow(input_file, args, quality=90):
         raise RuntimeError(f"Pillow fallback failed: {e}")
 
 
-def copy_metadata(src_file, dst_file):
-    if shutil.which("exiftool"):
-        subprocess.run(
-            [
-                "exiftool",
-                "-overwrite_original",
-                "-TagsFromFile",
-                str(src_file),
-                "-all:all",
-                "-ignoreMinorErrors",
-                str(dst_file),
-            ],
-            capture_output=True,
+class ExifToolSession:
+    """
+    Long-lived `exiftool -stay_open` worker.
+
+    exiftool's ~200ms Perl startup otherwise gets paid once per
+    converted file; a single persistent process amortizes it away.
+    """
+
+    def __init__(self):
+        self.proc = subprocess.Popen(
+            [EXIFTOOL, "-stay_open", "True", "-@", "-"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
         )
 
+    def copy_tags(self, src_file, dst_file):
+        block = (
+            "-overwrite_original\n"
+            "-TagsFromFile\n"
+            f"{src_file}\n"
+            "-all:all\n"
+            "-ignoreMinorErrors\n"
+            f"{dst_file}\n"
+            "-execute\n"
+        )
+        self.proc.stdin.write(block.encode())
+        self.proc.stdin.flush()
+
+        # exiftool prints {ready} after finishing each -execute block
+        while True:
+            line = self.proc.stdout.readline()
+            if not line or line.strip().endswith(b"{ready}"):
+                break
+
+    def close(self):
+        try:
+            self.proc.stdin.write(b"-stay_open\nFalse\n")
+            self.proc.stdin.flush()
+            self.proc.wait(timeout=5)
+        except Exception:
+            self.proc.kill()
+
+
+_EXIFTOOL_SESSION = None
+
+
+def _get_exiftool_session():
+    # Lazy so each process-pool worker spawns its own session
+    global _EXIFTOOL_SESSION
+    if _EXIFTOOL_SESSION is None and EXIFTOOL is not None:
+        _EXIFTOOL_SESSION = ExifToolSession()
+        atexit.register(_EXIFTOOL_SESSION.close)
+    return _EXIFTOOL_SESSION
+
+
+def copy_metadata(src_file, dst_file):
+    session = _get_exiftool_session()
+    if session:
+        session.copy_tags(src_file, dst_file)
+
+
+# Metadata copies run off the encode critical path. One worker, since
+# the stay_open session consumes commands serially anyway.
+_META_POOL = ThreadPoolExecutor(max_workers=1)
+
+
+def _init_worker(cjxl_args):
+    """
+    Seeds CJXL_GLOBAL_ARGS in a pool worker. Passed via initargs so
+    workers get the value on any start method; fork-inherited module
+    state is empty under spawn/forkserver.
+    """
+    global CJXL_GLOBAL_ARGS
+    CJXL_GLOBAL_ARGS = cjxl_args
+
 
 def process_file(input_file, src_root, dst_root, args):
     rel = input_file.relative_to(src_root)
@@ -141,7 +280,14 @@ def process_file(input_file, src_root, dst_root, args):
     ext = input_file.suffix.lower()
 
     # --- CONFLICT RESOLUTION ---
-    if output_file.exists():
+    # One os.stat instead of the extra syscall Path.exists would issue
+    try:
+        os.stat(output_file)
+        output_exists = True
+    except FileNotFoundError:
+        output_exists = False
+
+    if output_exists:
         if args.skip:
             print(f"[SKIP] {input_file.name} (Already exists)")
             return
@@ -163,9 +309,10 @@ def process_file(input_file, src_root, dst_root, args):
 
     output_file.parent.mkdir(parents=True, exist_ok=True)
 
-    src_size = input_file.stat().st_size
+    src_size = os.stat(input_file).st_size
     is_jpeg = ext in {".jpg", ".jpeg", ".jfif", ".pjpeg", ".pjp"}
-    is_heic = ext in {".heic", ".heif"}
+    # With native HEIC support, HEIC takes the standard cjxl path below
+    is_heic = ext in {".heic", ".heif"} and not HEIC_NATIVE
 
     # Determine minimum allowed quality based on flags
     match (args.compress_lq, args.compress_mq, args.compress_hq):
@@ -195,7 +342,7 @@ def process_file(input_file, src_root, dst_root, args):
             elif is_jpeg:
                 if current_quality == 90:
                     code, data, err = run_cjxl_in_memory(
-                        ["cjxl", str(input_file), "-", "--lossless_jpeg=1"], args
+                        [str(input_file), "-", "--lossless_jpeg=1"]
                     )
                     if code == 0:
                         jxl_data = data
@@ -203,14 +350,12 @@ def process_file(input_file, src_root, dst_root, args):
                     else:
                         code, data, err = run_cjxl_in_memory(
                             [
-                                "cjxl",
                                 str(input_file),
                                 "-",
                                 "--quality",
                                 str(current_quality),
                                 "--lossless_jpeg=0",
-                            ],
-                            args,
+                            ]
                         )
                         if code == 0:
                             jxl_data = data
@@ -220,14 +365,12 @@ def process_file(input_file, src_root, dst_root, args):
                 else:
                     code, data, err = run_cjxl_in_memory(
                         [
-                            "cjxl",
                             str(input_file),
                             "-",
                             "--quality",
                             str(current_quality),
                             "--lossless_jpeg=0",
-                        ],
-                        args,
+                        ]
                     )
                     if code == 0:
                         jxl_data = data
@@ -238,14 +381,12 @@ def process_file(input_file, src_root, dst_root, args):
             else:
                 code, data, err = run_cjxl_in_memory(
                     [
-                        "cjxl",
                         str(input_file),
                         "-",
                         "--quality",
                         str(current_quality),
                         "--lossless_jpeg=0",
-                    ],
-                    args,
+                    ]
                 )
                 if code == 0:
                     jxl_data = data
@@ -283,7 +424,9 @@ def process_file(input_file, src_root, dst_root, args):
                 break
 
             if current_quality > min_quality:
-                current_quality -= 5
+                # One retry at the floor instead of stepping Q-5 at a
+                # time - every step was a full cjxl encode
+                current_quality = min_quality
                 continue
 
             final_jxl_data = jxl_data
@@ -295,7 +438,11 @@ def process_file(input_file, src_root, dst_root, args):
         jxl_size = len(final_jxl_data)
 
         if jxl_size < src_size or args.force_jxl:
-            output_file.write_bytes(final_jxl_data)
+            fd = os.open(output_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                os.write(fd, final_jxl_data)
+            finally:
+                os.close(fd)
 
             diff_percent = ((src_size - jxl_size) / src_size) * 100
 
@@ -310,7 +457,8 @@ def process_file(input_file, src_root, dst_root, args):
                     f"{status} {input_file.name} (-{diff_percent:.1f}%) [{final_method}]"
                 )
 
-            copy_metadata(input_file, output_file)
+            # Don't block the next encode on exiftool
+            _META_POOL.submit(copy_metadata, input_file, output_file)
         else:
             copy_original(
                 input_file, src_root, dst_root, reason="JXL larger & no force"
@@ -318,6 +466,8 @@ def process_file(input_file, src_root, dst_root, args):
 
 
 def main():
+    global CJXL_THREADS, CJXL_GLOBAL_ARGS
+
     parser = argparse.ArgumentParser(description="Batch Convert Images to JPEG XL")
     parser.add_argument("src_dir", help="Source directory containing images")
     parser.add_argument("dst_dir", help="Destination directory for JXL files")
@@ -381,11 +531,8 @@ def main():
         print("\n!!! MISSING LIBRARIES !!!")
         print("Please run: pip install pillow pillow-heif\n")
 
-    all_files = sorted(list(src.rglob("*")))
     print(f"Scanning {src}...")
-    print(
-        f"Found {len(all_files)} items. Starting conversion ({CJXL_THREADS} threads, Effort {args.effort})..."
-    )
+    print(f"Starting conversion ({CJXL_THREADS} threads, Effort {args.effort})...")
 
     if args.force_jxl:
         print("Mode: FORCE JXL")
@@ -399,25 +546,61 @@ def main():
 
     print("-" * 40 + "\n")
 
-    for item in all_files:
-        if not item.is_file():
-            continue
-        ext = item.suffix.lower()
+    def image_items():
+        """Streams convertible images; copies pass-through files inline."""
+        for item, ext in iter_files(src):
+            # Check for explicit copy request OR strictly unsupported formats
+            if ext in copy_extensions or ext in UNSUPPORTED_EXTS:
+                out = dst / item.relative_to(src)
+                out.parent.mkdir(parents=True, exist_ok=True)
+                if not out.exists():
+                    shutil.copyfile(item, out)
+
+                    reason = (
+                        "Explicit Copy" if ext in copy_extensions else "Unsupported"
+                    )
+                    print(f"[COPY] {item.name} ({reason})")
+                continue
 
-        # Check for explicit copy request OR strictly unsupported formats
-        if ext in copy_extensions or ext in UNSUPPORTED_EXTS:
-            out = dst / item.relative_to(src)
-            out.parent.mkdir(parents=True, exist_ok=True)
-            if not out.exists():
-                out.write_bytes(item.read_bytes())
+            if ext in IMAGE_EXTS:
+                yield item
 
-                reason = "Explicit Copy" if ext in copy_extensions else "Unsupported"
-                print(f"[COPY] {item.name} ({reason})")
-            continue
+    # Fan out across files when no interactive prompts are possible.
+    # cjxl's internal threads idle on small images, so lower them and
+    # let the pool saturate the cores instead.
+    parallel = args.skip or args.overwrite
+    if parallel:
+        CJXL_THREADS = 2
 
-        if ext in IMAGE_EXTS:
+    # Built once; handed to pool workers via the initializer below
+    CJXL_GLOBAL_ARGS = [
+        "--num_threads",
+        str(CJXL_THREADS),
+        "--effort",
+        str(args.effort),
+    ]
+
+    if parallel:
+        workers = max(1, (os.cpu_count() or 1) // 2)
+        print(f"Parallel mode: {workers} workers, {CJXL_THREADS} cjxl threads each")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(CJXL_GLOBAL_ARGS,),
+        ) as executor:
+            list(
+                executor.map(
+                    partial(process_file, src_root=src, dst_root=dst, args=args),
+                    image_items(),
+                )
+            )
+    else:
+        for item in image_items():
             process_file(item, src, dst, args)
 
+    # Drain any metadata copies still in flight
+    _META_POOL.shutdown(wait=True)
+
     print("\n--- Processing Complete ---")
 
 
@@ -22,7 +22,7 @@ import subprocess
 import sys
 from pathlib import Path
 
-VIDEO_EXTS = {
+VIDEO_EXTS = frozenset({
     ".mp4",
     ".mov",
     ".mkv",
@@ -33,7 +33,7 @@ VIDEO_EXTS = {
     ".mts",
     ".m2ts",
     ".3gp",
-}
+})
 
 # --- QUALITY PRESETS ---
 # Format: "name": ("preset", "crf")
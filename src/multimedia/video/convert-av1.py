@@ -20,9 +20,10 @@ import os
 import shutil
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-VIDEO_EXTS = {
+VIDEO_EXTS = frozenset({
     ".mp4",
     ".mov",
     ".mkv",
@@ -33,7 +34,7 @@ VIDEO_EXTS = {
     ".mts",
     ".m2ts",
     ".3gp",
-}
+})
 
 # --- QUALITY PRESETS ---
 # Format: "name": ("preset", "crf")
@@ -43,9 +44,51 @@ QUALITY_MAP = {
     "lq": ("9", "30"),  # Low Quality: Faster, smaller
 }
 
+# Optional: probe codecs in-process via libav instead of forking
+# ffprobe for every file.
+try:
+    import av
+
+    HAS_PYAV = True
+except ImportError:
+    HAS_PYAV = False
+
+
+def iter_videos(root: Path):
+    """
+    Streaming scandir walk yielding video files under root.
+
+    Prunes hidden directories (e.g. .git) during descent and relies on
+    the dirent type info instead of a stat call per entry.
+    """
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith("."):
+                            stack.append(entry.path)
+                    elif entry.is_file():
+                        dot = entry.name.rfind(".")
+                        if dot > 0 and entry.name[dot:].lower() in VIDEO_EXTS:
+                            yield Path(entry.path)
+        except PermissionError:
+            # Skip unreadable directories, matching rglob's behaviour
+            continue
+
 
 def get_video_codec(input_file: Path) -> str:
     """Detects the video codec (hevc, h264, vp9, av1, etc.)"""
+    if HAS_PYAV:
+        try:
+            with av.open(str(input_file)) as container:
+                for stream in container.streams.video:
+                    return stream.codec_context.name.lower()
+            return ""
+        except (av.FFmpegError, OSError):
+            return ""
+
     try:
         result = subprocess.run(
             [
@@ -105,31 +148,37 @@ def check_and_clean_destination(targets: list[Path]) -> bool:
     Returns False if no file exists (proceed processing).
     Deletes 0KB files if found.
     """
-    targets = list(set(targets))  # Remove duplicates
-
-    for target in targets:
-        if target.exists():
-            size = target.stat().st_size
-            if size == 0:
-                print(f"[DELETE] Found 0KB file, removing to re-process: {target.name}")
-                try:
-                    target.unlink()
-                except OSError as e:
-                    print(f"[ERROR] Could not delete empty file {target.name}: {e}")
-            else:
-                # File exists and has data
-                print(f"[SKIP] {target.name} (Already exists)")
-                return True
+    # dict.fromkeys dedups while keeping the caller's priority order
+    for target in dict.fromkeys(targets):
+        # One stat covers both the existence and the size check
+        try:
+            size = os.stat(target).st_size
+        except FileNotFoundError:
+            continue
+
+        if size == 0:
+            print(f"[DELETE] Found 0KB file, removing to re-process: {target.name}")
+            try:
+                target.unlink()
+            except OSError as e:
+                print(f"[ERROR] Could not delete empty file {target.name}: {e}")
+        else:
+            # File exists and has data
+            print(f"[SKIP] {target.name} (Already exists)")
+            return True
 
     return False
 
 
-def convert_video(input_file: Path, output_file: Path, preset: str, crf: str):
+def convert_video(
+    input_file: Path, output_file: Path, preset: str, crf: str, threads: int = 0
+):
     """
     input_file: The source video file.
     output_file: The destination path.
     preset: AV1 preset (0-13)
     crf: Constant Rate Factor
+    threads: ffmpeg thread count (0 = let ffmpeg decide)
     """
     try:
         # Ensure parent directory exists
@@ -167,8 +216,11 @@ def convert_video(input_file: Path, output_file: Path, preset: str, crf: str):
 
         cmd = [
             "ffmpeg",
+            # Pooled encodes share the terminal; without this they all
+            # compete for (and mangle) interactive keypress input
+            "-nostdin",
             "-threads",
-            "0",
+            str(threads),
             "-i",
             str(input_file),
             "-map_metadata",
@@ -217,6 +269,14 @@ def main():
         help="Quality Level: hq (Preset 3/CRF 26), mq (Preset 8/CRF 30) [Default], lq (Preset 9/CRF 32)",
     )
 
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=max(1, (os.cpu_count() or 1) // 4),
+        help="Concurrent conversions in directory mode (default: cores/4)",
+    )
+
     args = parser.parse_args()
 
     src_path = Path(args.source)
@@ -234,12 +294,23 @@ def main():
         if not src_path.exists():
             sys.exit("Source directory not found.")
 
-        for item in src_path.rglob("*"):
-            if not item.is_file():
-                continue
-
-            if item.suffix.lower() in VIDEO_EXTS:
-                out_file = dst_path / item.relative_to(src_path).with_suffix(".mkv")
+        jobs = []
+        for item in iter_videos(src_path):
+            out_file = dst_path / item.relative_to(src_path).with_suffix(".mkv")
+            jobs.append((item, out_file))
+
+        if args.jobs > 1:
+            # SVT-AV1 scales poorly past ~4 threads at high presets, so
+            # several bounded encodes beat one wide one
+            with ThreadPoolExecutor(max_workers=args.jobs) as ex:
+                futures = [
+                    ex.submit(convert_video, item, out_file, preset, crf, 4)
+                    for item, out_file in jobs
+                ]
+                for future in futures:
+                    future.result()
+        else:
+            for item, out_file in jobs:
                 convert_video(item, out_file, preset, crf)
 
     else:
@@ -15,13 +15,62 @@
 # NON-INFRINGEMENT. See the RPL for specific language governing rights and
 # limitations under the RPL.
 
+import asyncio
+import atexit
+import functools
+import io
+import json
+import logging
 import os
+import re
 import shutil
 import subprocess
 import sys
 from pathlib import Path
 
-VIDEO_EXTS = {
+# print() flushes the (line-buffered) tty on every status line, which
+# serializes concurrent workers on terminal writes. Route status
+# through a block-buffered stream instead and flush it on exit.
+
+
+class _BufferedStreamHandler(logging.StreamHandler):
+    """
+    StreamHandler without the stock per-record flush, which would
+    defeat the block-buffered stream below. Output is flushed every
+    ~100 records, immediately for per-file results (encode-heavy runs
+    emit only a few lines per hour), and at exit via the atexit hook.
+    """
+
+    _FLUSH_EVERY = 100
+    _FLUSH_PREFIXES = ("[OK]", "[ERROR]", "[WARN]", "[ENC]")
+
+    def __init__(self, stream):
+        super().__init__(stream)
+        self._pending = 0
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            self._pending += 1
+            if self._pending >= self._FLUSH_EVERY or record.getMessage().startswith(
+                self._FLUSH_PREFIXES
+            ):
+                self.flush()
+                self._pending = 0
+        except Exception:
+            self.handleError(record)
+
+
+_LOG_STREAM = io.TextIOWrapper(sys.stdout.buffer, line_buffering=False)
+_LOG_HANDLER = _BufferedStreamHandler(_LOG_STREAM)
+_LOG_HANDLER.setFormatter(logging.Formatter("%(message)s"))
+logger = logging.getLogger("hevc")
+logger.addHandler(_LOG_HANDLER)
+logger.setLevel(logging.INFO)
+logger.propagate = False
+atexit.register(_LOG_HANDLER.flush)
+
+VIDEO_EXTS = frozenset({
     ".mp4",
     ".mov",
     ".mkv",
@@ -32,56 +81,212 @@ VIDEO_EXTS = {
     ".mts",
     ".m2ts",
     ".3gp",
-}
+})
 
+# NVENC sessions per encode batch; consumer GPUs allow only 2-3.
+HEVC_JOBS = int(os.environ.get("HEVC_JOBS", "2"))
 
-def get_video_codec(input_file: Path) -> str:
-    try:
-        result = subprocess.run(
-            [
-                "ffprobe",
-                "-v",
-                "error",
-                "-select_streams",
-                "v:0",
-                "-show_entries",
-                "stream=codec_name",
-                "-of",
-                "default=nokey=1:noprint_wrappers=1",
-                str(input_file),
-            ],
-            capture_output=True,
-            text=True,
-            check=True,
-        )
-        return result.stdout.strip().lower()
-    except subprocess.CalledProcessError:
+# Probes are cheap but latency-bound; keep several in flight so they
+# finish behind the running encode batch.
+PROBE_JOBS = 8
+
+# Both common case variants, so the walker can usually skip the
+# per-name .lower() allocation
+_VIDEO_EXTS_ANYCASE = frozenset(
+    variant for ext in VIDEO_EXTS for variant in (ext, ext.upper())
+)
+
+
+def iter_videos(root: Path):
+    """
+    Streaming scandir walk yielding video file paths (as str).
+
+    Filters on the raw entry name and uses the dirent type info, so no
+    Path object or stat call is spent on non-video entries.
+    """
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        dot = entry.name.rfind(".")
+                        if dot > 0:
+                            suffix = entry.name[dot:]
+                            if (
+                                suffix in _VIDEO_EXTS_ANYCASE
+                                or suffix.lower() in VIDEO_EXTS
+                            ):
+                                yield entry.path
+        except PermissionError:
+            # Skip unreadable directories, matching rglob's behaviour
+            continue
+
+
+# Header-only probe: avoids avformat_find_stream_info decoding frames,
+# which can cost hundreds of ms per file. Rare containers (mpeg-ts)
+# need the deep probe, handled by the fallback below.
+_FAST_PROBE_FLAGS = ["-probesize", "32", "-analyzeduration", "0", "-fflags", "+fastseek"]
+
+# Anchored to whole key=value lines, so a stray "10" elsewhere in the
+# probe output can no longer flag SDR input as 10-bit
+_HDR_RE = re.compile(
+    r"^(pix_fmt=(?:yuv420p10|yuv422p10|yuv444p10|p010le?|yuv.*10le)"
+    r"|bits_per_raw_sample=1[02])$",
+    re.M,
+)
+
+
+async def _probe(input_file: Path, entries: str, fast: bool = True) -> str:
+    """
+    Runs ffprobe for the requested stream entries, returning the raw
+    key=value output ("" on failure). The fast header-only probe falls
+    back to a full probe for containers it cannot parse.
+    """
+    cmd = ["ffprobe", "-v", "error"]
+    if fast:
+        cmd += _FAST_PROBE_FLAGS
+    cmd += [
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "stream=" + entries,
+        "-of",
+        "default=nokey=0:noprint_wrappers=1",
+        str(input_file),
+    ]
+
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, _ = await proc.communicate()
+
+    if proc.returncode != 0:
+        if fast:
+            return await _probe(input_file, entries, fast=False)
         return ""
 
+    return stdout.decode("utf-8", errors="replace")
+
 
-def is_hdr_or_10bit(input_file: Path) -> bool:
+async def probe_codec(input_file: Path) -> str:
+    """Codec name of the first video stream, lowercased ("" if unknown)."""
+    for fast in (True, False):
+        for line in (await _probe(input_file, "codec_name", fast=fast)).splitlines():
+            key, sep, value = line.partition("=")
+            if sep and key == "codec_name" and value.strip():
+                return value.strip().lower()
+        # Fast probe succeeded but the header carried no codec; retry deep
+    return ""
+
+
+async def probe_hdr(input_file: Path):
+    """
+    Whether the first video stream is HDR/10-bit; None when even the
+    deep probe produced no usable pix_fmt (probe failure).
+    """
+    for fast in (True, False):
+        out = await _probe(input_file, "pix_fmt,bits_per_raw_sample", fast=fast)
+        if _HDR_RE.search(out):
+            return True
+        if "pix_fmt=" in out and "pix_fmt=unknown" not in out:
+            return False
+        # Fast probe succeeded but carried no usable pix_fmt; retry deep
+    return None
+
+
+# Probe results persist across runs in the destination tree, so a
+# re-run over unchanged sources costs zero ffprobe invocations. Only
+# touched from the event loop, so no locking is needed.
+_PROBE_CACHE = {}
+_PROBE_CACHE_FILE = None
+
+
+def _load_probe_cache(dst_path: Path):
+    global _PROBE_CACHE_FILE
+    _PROBE_CACHE_FILE = dst_path / ".probe_cache.json"
     try:
-        result = subprocess.run(
-            [
-                "ffprobe",
-                "-v",
-                "error",
-                "-select_streams",
-                "v:0",
-                "-show_entries",
-                "stream=pix_fmt,bits_per_raw_sample",
-                "-of",
-                "default=nokey=1:noprint_wrappers=1",
-                str(input_file),
-            ],
-            capture_output=True,
-            text=True,
-            check=True,
-        )
-        out = result.stdout.lower()
-        return "10" in out or "yuv420p10" in out or "p010" in out
-    except subprocess.CalledProcessError:
-        return False
+        with open(_PROBE_CACHE_FILE) as fh:
+            _PROBE_CACHE.update(json.load(fh))
+    except (OSError, ValueError):
+        pass
+
+
+def _save_probe_cache():
+    if _PROBE_CACHE_FILE is None:
+        return
+    try:
+        os.makedirs(_PROBE_CACHE_FILE.parent, exist_ok=True)
+        with open(_PROBE_CACHE_FILE, "w") as fh:
+            json.dump(_PROBE_CACHE, fh)
+    except OSError:
+        pass
+
+
+def _cache_key(input_file: Path):
+    try:
+        st = os.stat(input_file)
+    except OSError:
+        return None
+    return f"{input_file}:{st.st_size}:{st.st_mtime_ns}"
+
+
+async def probe_codec_cached(input_file: Path) -> str:
+    """probe_codec with the (path, size, mtime) sidecar cache in front."""
+    key = _cache_key(input_file)
+    if key is None:
+        return await probe_codec(input_file)
+
+    entry = _PROBE_CACHE.setdefault(key, {})
+    if "codec_name" not in entry:
+        codec = await probe_codec(input_file)
+        if not codec:
+            # Don't persist a failed probe; a transient error would
+            # otherwise mis-route this file on every future run
+            return ""
+        entry["codec_name"] = codec
+    return entry["codec_name"]
+
+
+async def probe_hdr_cached(input_file: Path) -> bool:
+    """probe_hdr with the (path, size, mtime) sidecar cache in front."""
+    key = _cache_key(input_file)
+    if key is None:
+        return bool(await probe_hdr(input_file))
+
+    entry = _PROBE_CACHE.setdefault(key, {})
+    if "hdr" not in entry:
+        hdr = await probe_hdr(input_file)
+        if hdr is None:
+            # Don't persist a failed probe; fall back to SDR this run
+            return False
+        entry["hdr"] = hdr
+    return entry["hdr"]
+
+
+def _fast_copy(src: Path, dst: Path):
+    """
+    Copy preserving metadata, with an in-kernel fast path.
+
+    os.copy_file_range never surfaces the bytes to userspace and
+    triggers copy-on-write sharing on XFS/Btrfs; shutil.copyfile
+    (sendfile on Linux) covers filesystems where it is unsupported.
+    """
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            remaining = os.fstat(s.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(s.fileno(), d.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+    except OSError:
+        shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
 
 
 def check_and_clean_destination(mkv_path: Path, orig_path: Path) -> bool:
@@ -91,119 +296,292 @@ def check_and_clean_destination(mkv_path: Path, orig_path: Path) -> bool:
     Returns False if no file exists (proceed processing).
     Deletes 0KB files if found.
     """
-    targets = [mkv_path, orig_path]
-
-    for target in targets:
-        if target.exists():
-            size = target.stat().st_size
-            if size == 0:
-                print(f"[DELETE] Found 0KB file, removing to re-process: {target.name}")
-                try:
-                    target.unlink()
-                except OSError as e:
-                    print(f"[ERROR] Could not delete empty file {target.name}: {e}")
-                # We deleted it, so we continue to return False (process it)
-            else:
-                # File exists and has data
-                print(f"[SKIP] {target.name} (Already exists)")
-                return True
+    for target in (mkv_path, orig_path):
+        # One os.stat covers both the existence and the size check
+        try:
+            size = os.stat(target).st_size
+        except FileNotFoundError:
+            continue
+
+        if size == 0:
+            logger.info(f"[DELETE] Found 0KB file, removing to re-process: {target.name}")
+            try:
+                os.unlink(target)
+            except OSError as e:
+                logger.info(f"[ERROR] Could not delete empty file {target.name}: {e}")
+            # We deleted it, so we continue to return False (process it)
+        else:
+            # File exists and has data
+            logger.info(f"[SKIP] {target.name} (Already exists)")
+            return True
 
     return False
 
 
-def convert_video(input_file: Path, output_file_mkv: Path):
+# Immutable ffmpeg argument fragments, built once at import instead of
+# re-allocated ~40 strings per encode.
+
+# Keep decoded frames in VRAM end-to-end (NVDEC -> NVENC); without the
+# output format flag each frame roundtrips over PCIe
+_NVENC_DECODE = (
+    "-hwaccel",
+    "cuda",
+    "-hwaccel_output_format",
+    "cuda",
+    "-extra_hw_frames",
+    "8",
+)
+
+# ---- NVENC HEVC MAX COMPRESSION ----
+_NVENC_ENCODE = (
+    "-c:v",
+    "hevc_nvenc",
+    "-preset",
+    "p7",  # Slowest/Best quality preset
+    "-tune",
+    "hq",
+    "-tier",
+    "high",  # Allow high peak bitrate for complex scenes
+    "-rc",
+    "vbr",
+    "-multipass",
+    "qres",  # Quarter-res first pass: near-fullres quality, much faster
+    "-cq:v",
+    "18",
+    "-b:v",
+    "0",
+    "-bf",
+    "3",  # Use 3 B-frames
+    "-b_ref_mode",
+    "middle",
+    "-rc-lookahead",
+    "32",
+    "-spatial-aq",
+    "1",
+    "-temporal-aq",
+    "1",
+    "-aq-strength",
+    "8",
+)
+
+# Frames arrive as CUDA surfaces, so the format conversion must stay
+# on the GPU: a plain -pix_fmt would make ffmpeg insert a software
+# format filter that cannot accept CUDA frames and abort the encode
+_HDR_PIX = ("-profile:v", "main10", "-vf", "scale_cuda=format=p010le")
+_SDR_PIX = ("-vf", "scale_cuda=format=yuv420p")
+# All audio and subtitle tracks pass through untouched; both encode
+# paths map streams explicitly so batched and single-file runs of the
+# same library produce identical track layouts
+_COPY_TAIL = ("-c:a", "copy", "-c:s", "copy")
+
+
+@functools.lru_cache(maxsize=4)
+def _encode_flags(hdr: bool) -> tuple:
+    # Only two variants exist; memoizing makes the per-job cost a dict
+    # hit instead of splicing ~40 strings into a fresh list
+    return (*_NVENC_ENCODE, *(_HDR_PIX if hdr else _SDR_PIX), *_COPY_TAIL)
+
+
+# Directories already created this run; files share parents, so the
+# repeated exist_ok makedirs syscalls are almost always redundant
+_MKDIR_CACHE = set()
+
+
+def _ensure_dir(path: Path):
+    if path not in _MKDIR_CACHE:
+        os.makedirs(path, exist_ok=True)
+        _MKDIR_CACHE.add(path)
+
+
+async def convert_video(input_file: Path, output_file_mkv: Path):
+    """
+    Routes one file by codec: returns ("copy", src, dst, codec) when
+    the input is already efficiently compressed, ("encode", src, dst,
+    hdr) when it needs NVENC, or None to skip.
+    """
     try:
         # Ensure parent directory exists
-        os.makedirs(output_file_mkv.parent, exist_ok=True)
+        _ensure_dir(output_file_mkv.parent)
 
         # 1. CHECK DESTINATION EXISTENCE
         output_file_orig = output_file_mkv.with_suffix(input_file.suffix)
 
         if check_and_clean_destination(output_file_mkv, output_file_orig):
-            return
+            return None
 
-        # 2. CHECK CODEC
-        codec = get_video_codec(input_file)
+        # 2. CHECK CODEC (codec only: copied files never need pix_fmt)
+        codec = await probe_codec_cached(input_file)
 
         # --- SMART COPY LOGIC (VP9 + HEVC/H.265) ---
         # If it's already compressed efficiently (VP9) or already in target format (HEVC), just copy.
         if codec in ["vp9", "hevc", "h265", "av1"]:
-            shutil.copy2(input_file, output_file_orig)
-            print(f"[COPY] {output_file_orig.name} ({codec.upper()} direct copy)")
-            return
+            return ("copy", input_file, output_file_orig, codec)
         # -------------------------------------------
 
-        # 3. START PROCESSING
-        hdr = is_hdr_or_10bit(input_file)
-
-        cmd = [
-            "ffmpeg",
-            "-threads",
-            "0",
-            "-hwaccel",
-            "cuda",
-            "-i",
-            str(input_file),
-            "-map_metadata",
-            "0",
-            # ---- NVENC HEVC MAX COMPRESSION ----
-            "-c:v",
-            "hevc_nvenc",
-            "-preset",
-            "p7",  # Slowest/Best quality preset
-            "-tier",
-            "high",  # Allow high peak bitrate for complex scenes
-            "-rc",
-            "vbr",
-            "-multipass",
-            "fullres",  # 2-Pass encoding
-            "-cq:v",
-            "18",
-            "-b:v",
-            "0",
-            "-bf",
-            "3",  # Use 3 B-frames
-            "-b_ref_mode",
-            "middle",
-            "-look_ahead",
-            "32",
-            "-spatial_aq",
-            "1",
-            "-temporal_aq",
-            "1",
-            "-aq-strength",
-            "10",
-        ]
-
-        if hdr:
-            cmd += [
-                "-profile:v",
-                "main10",
-                "-pix_fmt",
-                "p010le",
-            ]
-        else:
-            cmd += [
-                "-pix_fmt",
-                "yuv420p",
-            ]
-
-        cmd += [
-            "-c:a",
-            "copy",
-            str(output_file_mkv),
-        ]
-
-        subprocess.run(cmd, check=True)
-        print(f"[OK] {output_file_mkv.name} ({'HDR' if hdr else 'SDR'})")
-
-    except subprocess.CalledProcessError as e:
-        print(f"[ERROR] Processing failed for {input_file}\n{e}")
-        if output_file_mkv.exists():
-            try:
-                output_file_mkv.unlink()
-            except OSError:
-                pass
+        # 3. NEEDS ENCODING; only now pay the HDR probe
+        return ("encode", input_file, output_file_mkv, await probe_hdr_cached(input_file))
+
+    except OSError as e:
+        logger.info(f"[ERROR] Processing failed for {input_file}\n{e}")
+        return None
+
+
+# -nostats drops the carriage-return status line ffmpeg redraws many
+# times a second on stderr; -progress pipe:1 replaces it with a
+# machine-readable key=value block about once a second.
+# -threads 1: the pipeline is GPU-resident; auto-sized CPU worker
+# threads would only add scheduler contention across sessions
+_FFMPEG_BASE = (
+    "ffmpeg",
+    # Outputs are script-owned .part temps; overwrite stale ones from
+    # interrupted runs instead of blocking on the hidden [y/N] prompt
+    "-y",
+    "-hide_banner",
+    "-nostats",
+    "-loglevel",
+    "error",
+    "-progress",
+    "pipe:1",
+    "-threads",
+    "1",
+)
+
+
+async def _run_ffmpeg(args: list, label: str) -> int:
+    """
+    Runs ffmpeg, parsing the -progress stream into one compact final
+    status line instead of the interleaved per-frame stderr chatter.
+    On failure the tail of stderr is logged; -loglevel error keeps it
+    to actual diagnostics, so this costs nothing on success.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *_FFMPEG_BASE,
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+
+    # Drain stderr concurrently so neither pipe can fill and deadlock
+    stderr_task = asyncio.ensure_future(proc.stderr.read())
+
+    out_time = "?"
+    speed = "?"
+    async for raw in proc.stdout:
+        line = raw.decode("ascii", errors="replace").strip()
+        key, sep, value = line.partition("=")
+        if not sep:
+            continue
+        if key == "out_time":
+            out_time = value.partition(".")[0]
+        elif key == "speed":
+            speed = value
+
+    stderr_data = await stderr_task
+    rc = await proc.wait()
+    if rc == 0:
+        logger.info(f"[ENC] {label}: {out_time} encoded at {speed}")
+    else:
+        tail = stderr_data.decode("utf-8", errors="replace").strip().splitlines()
+        for line in tail[-5:]:
+            logger.info(f"[ffmpeg] {label}: {line}")
+    return rc
+
+
+def _accept_output(tmp: Path, final: Path) -> bool:
+    """
+    Promotes a finished encode to its final name.
+
+    ffmpeg can exit cleanly yet leave a 0-byte or truncated file (e.g.
+    on NVENC session errors); requiring a minimum size before the
+    atomic rename keeps the skip-if-exists check trustworthy.
+    """
+    try:
+        if os.stat(tmp).st_size < 1024:
+            return False
+        os.replace(tmp, final)
+        return True
+    except OSError:
+        return False
+
+
+def _discard_tmp(tmp: Path):
+    try:
+        tmp.unlink()
+    except OSError:
+        pass
+
+
+async def _encode_one(input_file: Path, output_file_mkv: Path, hdr: bool):
+    tmp = output_file_mkv.with_suffix(".mkv.part")
+    args = [
+        *_NVENC_DECODE,
+        "-i",
+        str(input_file),
+        "-map",
+        "0:v:0",
+        "-map",
+        "0:a?",
+        "-map",
+        "0:s?",
+        "-map_metadata",
+        "0",
+        *_encode_flags(hdr),
+        str(tmp),
+    ]
+
+    rc = await _run_ffmpeg(args, input_file.name)
+    if rc == 0 and _accept_output(tmp, output_file_mkv):
+        logger.info(f"[OK] {output_file_mkv.name} ({'HDR' if hdr else 'SDR'})")
+    else:
+        logger.info(f"[ERROR] Processing failed for {input_file}")
+        _discard_tmp(tmp)
+
+
+async def _encode_batch(jobs: list):
+    """
+    Encodes several files in one ffmpeg process.
+
+    CUDA context and NVENC session setup cost seconds per launch; one
+    invocation with multiple inputs and outputs pays them once. A
+    failed batch is deleted and retried per file so one malformed
+    input cannot sink its neighbours.
+    """
+    if len(jobs) == 1:
+        await _encode_one(*jobs[0])
+        return
+
+    tmps = [output.with_suffix(".mkv.part") for _, output, _ in jobs]
+
+    args = []
+    for input_file, _, _ in jobs:
+        args += [*_NVENC_DECODE, "-i", str(input_file)]
+
+    for i, (_, _, hdr) in enumerate(jobs):
+        args += ["-map", f"{i}:v:0", "-map", f"{i}:a?", "-map", f"{i}:s?"]
+        args += ["-map_metadata", str(i)]
+        args += _encode_flags(hdr)
+        args.append(str(tmps[i]))
+
+    label = f"batch of {len(jobs)}"
+    if await _run_ffmpeg(args, label) == 0:
+        # Promote each output on its own; one truncated file only
+        # re-runs that file, not the whole batch
+        retry = []
+        for (input_file, output_file_mkv, hdr), tmp in zip(jobs, tmps):
+            if _accept_output(tmp, output_file_mkv):
+                logger.info(f"[OK] {output_file_mkv.name} ({'HDR' if hdr else 'SDR'})")
+            else:
+                _discard_tmp(tmp)
+                retry.append((input_file, output_file_mkv, hdr))
+        for job in retry:
+            await _encode_one(*job)
+        return
+
+    logger.info(f"[WARN] Batch of {len(jobs)} failed, retrying files individually")
+    for tmp in tmps:
+        _discard_tmp(tmp)
+    for job in jobs:
+        await _encode_one(*job)
 
 
 def main(src_dir: str, dst_dir: str):
@@ -211,18 +589,76 @@ def main(src_dir: str, dst_dir: str):
     dst_path = Path(dst_dir)
 
     if not src_path.is_dir():
-        print("Source directory not found.")
+        logger.info("Source directory not found.")
         sys.exit(1)
 
-    for item in src_path.rglob("*"):
-        if item.is_file() and item.suffix.lower() in VIDEO_EXTS:
-            out_file = dst_path / item.relative_to(src_path).with_suffix(".mkv")
-            convert_video(item, out_file)
+    pairs = []
+    for path in iter_videos(src_path):
+        item = Path(path)
+        pairs.append(
+            (item, dst_path / item.relative_to(src_path).with_suffix(".mkv"))
+        )
+
+    _load_probe_cache(dst_path)
+
+    try:
+        asyncio.run(_process_all(pairs))
+    finally:
+        _save_probe_cache()
+
+
+async def _process_all(pairs: list):
+    """
+    Probes the whole tree up front, then buckets the work: copies run
+    on a worker thread while the encoder walks full HEVC_JOBS batches.
+
+    Encode jobs are sorted SDR-before-HDR so each batched ffmpeg
+    session carries one NVENC configuration; probes cost milliseconds
+    against minutes per encode, so materializing the plan first buys
+    better batching for a negligible startup delay.
+    """
+    probe_sem = asyncio.Semaphore(PROBE_JOBS)
+
+    async def route(pair):
+        async with probe_sem:
+            return await convert_video(*pair)
+
+    routed = await asyncio.gather(*(route(pair) for pair in pairs))
+
+    # Same-stem inputs (movie.mp4 + movie.avi) map to one output; with
+    # routing done ahead of encoding the destination check no longer
+    # guards this, so dedupe at bucketing time — first input wins
+    copies = []
+    encodes = []
+    claimed = set()
+    for job in routed:
+        if job is None:
+            continue
+        kind, src, dst = job[0], job[1], job[2]
+        if dst in claimed:
+            logger.info(f"[SKIP] {src.name} (duplicate output {dst.name})")
+            continue
+        claimed.add(dst)
+        (copies if kind == "copy" else encodes).append(job[1:])
+
+    encodes.sort(key=lambda job: job[2])  # group SDR / HDR together
+
+    async def copy_all():
+        for src, dst, codec in copies:
+            # Blocking file copy; keep the event loop free for encodes
+            await asyncio.to_thread(_fast_copy, src, dst)
+            logger.info(f"[COPY] {dst.name} ({codec.upper()} direct copy)")
+
+    async def encode_all():
+        for i in range(0, len(encodes), HEVC_JOBS):
+            await _encode_batch(encodes[i : i + HEVC_JOBS])
+
+    await asyncio.gather(copy_all(), encode_all())
 
 
 if __name__ == "__main__":
     if len(sys.argv) != 3:
-        print(f"Usage: {sys.argv[0]} <source_dir> <destination_dir>")
+        logger.info(f"Usage: {sys.argv[0]} <source_dir> <destination_dir>")
         sys.exit(1)
 
     main(sys.argv[1], sys.argv[2])